@@ -1,3 +1,4 @@
+import keras.backend as K
 import numpy as np
 from keras.layers import Dense, Flatten, Input, merge
 from keras.models import Model
@@ -5,7 +6,7 @@ from keras.optimizers import Adam
 import os
 
 from kerasRL.rl.agents import DDPGAgent
-from kerasRL.rl.memory import SequentialMemory
+from kerasRL.rl.memory import ArrayMemory
 from kerasRL.rl.random import OrnsteinUhlenbeckProcess
 from noises import ExplorationNoise
 from rewards import DefaultReward
@@ -14,6 +15,19 @@ GAMMA = 0.99
 TAU = 1e-3
 
 
+class FrozenActor:
+    # Inference-only copy of the network built by DDPGTorcs.get_actor, evaluated with plain numpy
+    def __init__(self, actor):
+        weights = [np.asarray(w, dtype=np.float32) for w in actor.get_weights()]
+        self.__layers = list(zip(weights[0::2], weights[1::2]))
+
+    def predict_on_batch(self, batch):
+        x = np.asarray(batch, dtype=np.float32).reshape(len(batch), -1)
+        for w, b in self.__layers[:-1]:
+            x = np.maximum(x.dot(w) + b, 0)
+        w, b = self.__layers[-1]
+        return np.tanh(x.dot(w) + b)
+
 
 class DDPGTorcs:
     @staticmethod
@@ -39,6 +53,12 @@ class DDPGTorcs:
 
 
 
+    @staticmethod
+    def __bind_predict_function(model):
+        # Compiled once for the model's fixed inputs, so calls skip the input checks of Model.predict_on_batch
+        function = K.function(model.inputs, model.outputs)
+        model.predict_on_batch = lambda batch: function(batch if type(batch) is list else [batch])[0]
+
     @staticmethod
     def __run(reward_writer, load=False, save=False, gui=True, load_file_path='', save_file_path='', timeout=10000,
               track='g-track-1',
@@ -50,7 +70,7 @@ class DDPGTorcs:
         actor = DDPGTorcs.get_actor(env.observation_space.shape, env.action_space.shape)
         critic, action_input = DDPGTorcs.__get_critic(env.observation_space.shape, env.action_space.shape)
 
-        memory = SequentialMemory(limit=100000, window_length=1)
+        memory = ArrayMemory(limit=100000, window_length=1)
 
         random_process = ExplorationNoise(nb_steps=nb_steps,
                                           epsilon=epsilon,
@@ -66,6 +86,8 @@ class DDPGTorcs:
                           limit_action=limit_action)
 
         agent.compile((Adam(lr=.0001, clipnorm=1.), Adam(lr=.001, clipnorm=1.)), metrics=['mse'])
+        for model in (agent.actor, agent.target_actor, agent.target_critic):
+            DDPGTorcs.__bind_predict_function(model)
         if load:
             agent.load_weights(load_file_path)
         if train:
@@ -73,6 +95,8 @@ class DDPGTorcs:
                       nb_max_episode_steps=nb_max_episode_steps)
             lap_number = env.get_lap_number()
         else:
+            # Weights are fixed while testing, so skip the backend and run the actor in numpy
+            agent.actor.predict_on_batch = FrozenActor(actor).predict_on_batch
             agent.test(env, visualize=False, nb_max_episode_steps=nb_max_episode_steps)
             return env.did_one_lap()
 
@@ -7,10 +7,8 @@ from ddpg_torcs import DDPGTorcs
 def convert_h5f_dlj4(actor_model, h5f_filepath, out_filepath):
     actor_filepath = h5f_filepath
     actor_model.load_weights(actor_filepath)
-    r = []
-    for w in actor_model.get_weights():
-        r += np.transpose(w).flatten().tolist()
-    np.savetxt(out_filepath, np.array(r))
+    weights = np.concatenate([np.transpose(w).ravel() for w in actor_model.get_weights()])
+    np.savetxt(out_filepath, weights)
 
 def convert_all( h5f_folder, dlj4_folder):
     actor_model = DDPGTorcs.get_actor((29,), (2,))
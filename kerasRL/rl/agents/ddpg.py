@@ -6,6 +6,7 @@ import keras.backend as K
 import numpy as np
 
 from kerasRL.rl.core import Agent
+from kerasRL.rl.memory import ArrayMemory
 from kerasRL.rl.random import OrnsteinUhlenbeckProcess
 from kerasRL.rl.util import *
 
@@ -293,21 +294,27 @@ class DDPGAgent(Agent):
         # Train the network on a single stochastic batch.
         can_train_either = self.step > self.nb_steps_warmup_critic or self.step > self.nb_steps_warmup_actor
         if can_train_either and self.step % self.train_interval == 0:
-            experiences = self.memory.sample(self.batch_size)
-            assert len(experiences) == self.batch_size
-
-            # Start by extracting the necessary parameters (we use a vectorized implementation).
-            state0_batch = []
-            reward_batch = []
-            action_batch = []
-            terminal1_batch = []
-            state1_batch = []
-            for e in experiences:
-                state0_batch.append(e.state0)
-                state1_batch.append(e.state1)
-                reward_batch.append(e.reward)
-                action_batch.append(e.action)
-                terminal1_batch.append(0. if e.terminal1 else 1.)
+            if isinstance(self.memory, ArrayMemory):
+                # The memory already returns whole batches as arrays.
+                state0_batch, action_batch, reward_batch, state1_batch, terminal1_batch = self.memory.sample(
+                    self.batch_size)
+                terminal1_batch = np.where(terminal1_batch, 0., 1.)
+            else:
+                experiences = self.memory.sample(self.batch_size)
+                assert len(experiences) == self.batch_size
+
+                # Start by extracting the necessary parameters (we use a vectorized implementation).
+                state0_batch = []
+                reward_batch = []
+                action_batch = []
+                terminal1_batch = []
+                state1_batch = []
+                for e in experiences:
+                    state0_batch.append(e.state0)
+                    state1_batch.append(e.state1)
+                    reward_batch.append(e.reward)
+                    action_batch.append(e.action)
+                    terminal1_batch.append(0. if e.terminal1 else 1.)
 
             # Prepare and validate parameters.
             state0_batch = self.process_state_batch(state0_batch)
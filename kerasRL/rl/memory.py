@@ -191,6 +191,80 @@ class SequentialMemory(Memory):
         return config
 
 
+class ArrayMemory(Memory):
+    def __init__(self, limit, **kwargs):
+        super(ArrayMemory, self).__init__(**kwargs)
+        if self.window_length != 1:
+            raise ValueError('`ArrayMemory` only supports `window_length=1`.')
+
+        self.limit = limit
+
+        # Same transitions as `SequentialMemory`, but kept in preallocated arrays so that a whole batch
+        # is gathered with a single fancy index instead of one `Experience` per sample. Observation and
+        # action arrays are allocated on the first append, once their shapes are known.
+        self.start = 0
+        self.length = 0
+        self.observations = None
+        self.actions = None
+        self.rewards = np.empty(limit, dtype=np.float32)
+        self.terminals = np.empty(limit, dtype=np.bool_)
+
+    def sample(self, batch_size, batch_idxs=None):
+        if batch_idxs is None:
+            # Draw random indexes such that we have at least a single entry before each
+            # index.
+            batch_idxs = sample_batch_indexes(0, self.nb_entries - 1, size=batch_size)
+        batch_idxs = np.array(batch_idxs) + 1
+        assert np.min(batch_idxs) >= 1
+        assert np.max(batch_idxs) < self.nb_entries
+        assert len(batch_idxs) == batch_size
+
+        # Replace the transitions right after an environment reset, exactly like `SequentialMemory`.
+        while True:
+            terminal0 = (batch_idxs >= 2) & self.terminals[self.__ring_indexes(batch_idxs - 2)]
+            nb_terminal0 = np.count_nonzero(terminal0)
+            if nb_terminal0 == 0:
+                break
+            batch_idxs[terminal0] = sample_batch_indexes(1, self.nb_entries, size=nb_terminal0)
+
+        idxs0 = self.__ring_indexes(batch_idxs - 1)
+        idxs1 = self.__ring_indexes(batch_idxs)
+        state0_batch = self.observations[idxs0][:, np.newaxis]
+        state1_batch = self.observations[idxs1][:, np.newaxis]
+        return state0_batch, self.actions[idxs0], self.rewards[idxs0], state1_batch, self.terminals[idxs0]
+
+    def append(self, observation, action, reward, terminal, training=True):
+        super(ArrayMemory, self).append(observation, action, reward, terminal, training=training)
+
+        if training:
+            if self.observations is None:
+                self.observations = np.empty((self.limit,) + np.shape(observation), dtype=np.float32)
+                self.actions = np.empty((self.limit,) + np.shape(action), dtype=np.float32)
+
+            idx = (self.start + self.length) % self.limit
+            if self.length < self.limit:
+                self.length += 1
+            else:
+                # No space, overwrite the oldest entry.
+                self.start = (self.start + 1) % self.limit
+            self.observations[idx] = observation
+            self.actions[idx] = action
+            self.rewards[idx] = reward
+            self.terminals[idx] = terminal
+
+    def __ring_indexes(self, idxs):
+        return (self.start + idxs) % self.limit
+
+    @property
+    def nb_entries(self):
+        return self.length
+
+    def get_config(self):
+        config = super(ArrayMemory, self).get_config()
+        config['limit'] = self.limit
+        return config
+
+
 class EpisodeParameterMemory(Memory):
     def __init__(self, limit, **kwargs):
         super(EpisodeParameterMemory, self).__init__(**kwargs)
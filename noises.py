@@ -1,18 +1,41 @@
 import numpy as np
 
+# Number of steps worth of Gaussian draws generated at once
+GAUSSIAN_POOL_SIZE = 4096
+
 
 class ExplorationNoise:
     def __init__(self, nb_steps, epsilon, steer, accel_brake, noise=1):
         self.__step = 1.0 / nb_steps
         self.__epsilon = epsilon
-        self.__steer = steer
-        self.__accel_brake = accel_brake
         self.__noise = noise
 
+        # steer and accel_brake are advanced together as a single two-element Ornstein-Uhlenbeck state
+        processes = (steer, accel_brake)
+        self.__x = np.array([process.x_prev[0] for process in processes], dtype=np.float64)
+        self.__mu = np.array([process.mu for process in processes], dtype=np.float64)
+        self.__decay = np.array([process.theta * process.dt for process in processes], dtype=np.float64)
+        self.__sqrt_dt = np.sqrt([process.dt for process in processes])
+        self.__sigma_slope = np.array([process.m for process in processes], dtype=np.float64)
+        self.__sigma_start = np.array([process.c for process in processes], dtype=np.float64)
+        self.__sigma_min = np.array([process.sigma_min for process in processes], dtype=np.float64)
+        self.__n_steps = 0
+        self.__gaussian_pool = np.random.normal(size=(GAUSSIAN_POOL_SIZE, 2))
+        self.__pool_index = 0
+        # Returned by every sample() call, callers must not keep a reference across steps
+        self.__sample = np.empty(2, dtype=np.float64)
+
     def sample(self, state):
         self.__noise -= self.__step
-        ab = self.__accel_brake.sample()[0]
-        return self.__noise * self.__epsilon * np.array([self.__steer.sample()[0], ab])
+        sigma = np.maximum(self.__sigma_min, self.__sigma_slope * self.__n_steps + self.__sigma_start)
+        if self.__pool_index == GAUSSIAN_POOL_SIZE:
+            self.__gaussian_pool = np.random.normal(size=(GAUSSIAN_POOL_SIZE, 2))
+            self.__pool_index = 0
+        gaussian = self.__gaussian_pool[self.__pool_index]
+        self.__pool_index += 1
+        self.__x += self.__decay * (self.__mu - self.__x) + sigma * self.__sqrt_dt * gaussian
+        self.__n_steps += 1
+        return np.multiply(self.__x, self.__noise * self.__epsilon, out=self.__sample)
 
     def get_noise(self):
         return self.__noise
@@ -1,4 +1,5 @@
 import os
+import re
 import socket
 import subprocess
 import sys
@@ -13,6 +14,17 @@ import track_utilities
 from rewards import DefaultReward
 from utilities.time_speedup import speed_up_time
 
+# Matches every '(name value [value ...])' group of a server message
+SENSOR_PATTERN = re.compile(rb'\(([a-zA-Z]+) ([^)]*)\)')
+
+# Scalar actions in the order they are sent to the server, focus is appended separately
+ACTIONS_FORMAT = b'(steer %.3f)(accel %.3f)(gear %.3f)(brake %.3f)(clutch %.3f)(meta %.3f)'
+GEARS = frozenset([-1, 0, 1, 2, 3, 4, 5, 6])
+
+# Angles of the 19 track range finders requested when connecting
+SENSOR_ANGLES = b'-45 -19 -12 -7 -4 -2.5 -1.7 -1 -.5 0 .5 1 1.7 2.5 4 7 12 19 45'
+IDENTIFIED_MESSAGE = b'***identified***'
+
 
 class TorcsEnv(Env):
     def __init__(self, host='localhost', port=3001, sid='SCR', track='g-track-1', gui=True, timeout=10000, reward=None, n_lap=None):
@@ -156,6 +168,8 @@ class TorcsEnv(Env):
         os.system('pkill torcs')
 
     class Server:
+        # quickrace.xml with placeholder track name and category, parsed once per process
+        __race_xml_template = None
 
         def __init__(self, track, track_type, gui, timeout=10000):
             self.__gui = gui
@@ -188,23 +202,27 @@ class TorcsEnv(Env):
             self.__init_server()
 
         def __create_race_xml(self, track, track_type):
-            root = etree.parse(self.__quickrace_xml_path)
-            track_name = root.find('section[@name="Tracks"]/section[@name="1"]/attstr[@name="name"]')
-            track_name.set('val', track)
-            track_type_tree = root.find('section[@name="Tracks"]/section[@name="1"]/attstr[@name="category"]')
-            track_type_tree.set('val', track_type)
-            laps = root.find('section[@name="Quick Race"]/attnum[@name="laps"]')
-            laps.set('val', '1000')
-            track_type_tree.set('val', track_type)
-            root.write(self.__quickrace_xml_path)
+            if TorcsEnv.Server.__race_xml_template is None:
+                root = etree.parse(self.__quickrace_xml_path)
+                track_name = root.find('section[@name="Tracks"]/section[@name="1"]/attstr[@name="name"]')
+                track_name.set('val', '{track}')
+                track_type_tree = root.find('section[@name="Tracks"]/section[@name="1"]/attstr[@name="category"]')
+                track_type_tree.set('val', '{category}')
+                laps = root.find('section[@name="Quick Race"]/attnum[@name="laps"]')
+                laps.set('val', '1000')
+                TorcsEnv.Server.__race_xml_template = etree.tostring(root.getroot()).decode()
+            with open(self.__quickrace_xml_path, 'w') as f:
+                f.write(TorcsEnv.Server.__race_xml_template.replace('{track}', track).replace('{category}', track_type))
 
     class Client:
         def __init__(self, server, host, port, sid):
             self.__server = server
             self.__host = host
             self.__port = port
-            self.__sid = sid
+            self.__init_message = sid.encode() + b'(init ' + SENSOR_ANGLES + b')'
             self.__data_size = 2 ** 17
+            self.__buffer = bytearray(self.__data_size)
+            self.__view = memoryview(self.__buffer)
             self.__socket = self.__create_socket()
             self.__connect_to_server()
 
@@ -225,7 +243,7 @@ class TorcsEnv(Env):
 
         def __send_message(self, message):
             try:
-                self.__socket.sendto(message.encode(), (self.__host, self.__port))
+                self.__socket.sendto(message, (self.__host, self.__port))
             except socket.error as emsg:
                 print(u"Error sending to __server: %s Message %s" % (emsg[1], str(emsg[0])))
                 sys.exit(-1)
@@ -243,18 +261,14 @@ class TorcsEnv(Env):
         def __connect_to_server(self):
             tries = 3
             while True:
-                sensor_angles = "-45 -19 -12 -7 -4 -2.5 -1.7 -1 -.5 0 .5 1 1.7 2.5 4 7 12 19 45"
-                initmsg = '%s(init %s)' % (self.__sid, sensor_angles)
-
                 try:
-                    self.__socket.sendto(initmsg.encode(), (self.__host, self.__port))
+                    self.__socket.sendto(self.__init_message, (self.__host, self.__port))
                 except socket.error:
                     sys.exit(-1)
-                sockdata = str()
+                size = 0
 
                 try:
-                    sockdata, address = self.__socket.recvfrom(self.__data_size)
-                    sockdata = sockdata.decode('utf-8')
+                    size = self.__socket.recv_into(self.__view)
                 except socket.error:
                     # print("Waiting for __server on __port " + str(self.__port))
                     tries -= 1
@@ -262,39 +276,26 @@ class TorcsEnv(Env):
                         # print("Server didn't answer, sending restart signal")
                         self.__server.restart()
 
-                identify = '***identified***'
-                if identify in sockdata:
+                if self.__buffer.find(IDENTIFIED_MESSAGE, 0, size) != -1:
                     # print("Client connected on __port " + str(self.__port))
                     break
 
         @staticmethod
         def __encode_actions(actions):
-            out = str()
-            for k in actions:
-                out += '(' + k + ' '
-                v = actions[k]
-                if not type(v) is list:
-                    out += '%.3f' % v
-                else:
-                    out += ' '.join([str(x) for x in v])
-                out += ')'
-            return out
+            message = ACTIONS_FORMAT % (actions['steer'], actions['accel'], actions['gear'], actions['brake'],
+                                        actions['clutch'], actions['meta'])
+            focus = actions['focus']
+            if type(focus) is list:
+                return message + b'(focus ' + ' '.join([str(x) for x in focus]).encode() + b')'
+            return message + b'(focus %.3f)' % focus
 
         @staticmethod
-        def __limit_action(v, lo, hi):
-            if v < lo:
-                return lo
-            elif v > hi:
-                return hi
-            else:
-                return v
-
-        def __limit_actions(self, actions):
-            actions['steer'] = self.__limit_action(actions['steer'], -1, 1)
-            actions['brake'] = self.__limit_action(actions['brake'], 0, 1)
-            actions['accel'] = self.__limit_action(actions['accel'], 0, 1)
-            actions['clutch'] = self.__limit_action(actions['clutch'], 0, 1)
-            if actions['gear'] not in [-1, 0, 1, 2, 3, 4, 5, 6]:
+        def __limit_actions(actions):
+            actions['steer'] = min(max(actions['steer'], -1), 1)
+            actions['brake'] = min(max(actions['brake'], 0), 1)
+            actions['accel'] = min(max(actions['accel'], 0), 1)
+            actions['clutch'] = min(max(actions['clutch'], 0), 1)
+            if actions['gear'] not in GEARS:
                 actions['gear'] = 0
             if actions['meta'] not in [0, 1]:
                 actions['meta'] = 0
@@ -315,37 +316,28 @@ class TorcsEnv(Env):
 
             return self.__get_server_input()
 
-        def __parse_server_string(self, server_string):
+        @staticmethod
+        def __parse_server_string(server_string):
             track_data = {}
-            server_string = server_string.strip()[:-1]
-            server_string_list = server_string.strip().lstrip('(').rstrip(')').split(')(')
-            for i in server_string_list:
-                w = i.split(' ')
-                track_data[w[0]] = self.__destringify(w[1:])
-            return track_data
-
-        def __destringify(self, string):
-            if not string:
-                return string
-            if type(string) is str:
-                try:
-                    return float(string)
-                except ValueError:
-                    print("Could not find a value in %s" % string)
-                    return string
-            elif type(string) is list:
-                if len(string) < 2:
-                    return self.__destringify(string[0])
+            for name, values in SENSOR_PATTERN.findall(server_string):
+                values = values.split()
+                if not values:
+                    track_data[name.decode()] = ''
+                elif len(values) == 1:
+                    track_data[name.decode()] = float(values[0])
                 else:
-                    return [self.__destringify(i) for i in string]
+                    track_data[name.decode()] = np.array(values, dtype=float)
+            return track_data
 
         def __get_server_input(self):
-            sockdata = str()
+            size = 0
+            tries = 0
             while True:
                 try:
-                    sockdata, address = self.__socket.recvfrom(self.__data_size)
-                    sockdata = sockdata.decode('utf-8')
+                    size = self.__socket.recv_into(self.__view)
                 except socket.error:
-                    print('', end='')
-                if sockdata:
-                    return self.__parse_server_string(sockdata)
+                    # A refused datagram fails immediately while TORCS restarts, so back off instead of spinning
+                    time.sleep(0.001 * 2 ** min(tries, 6))
+                    tries += 1
+                if size:
+                    return self.__parse_server_string(self.__view[:size])
@@ -1,9 +1,19 @@
+import atexit
 import json
 import os
+import queue
+import threading
+import traceback
+from collections import deque
 from time import sleep
 import numpy as np
 
-from ddpg_torcs import DDPGTorcs
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from ddpg_torcs import DDPGTorcs, FrozenActor
 from rewards import DefaultReward
 from torcs_gym import TorcsEnv
 from utilities.reward_writer import RewardWriter
@@ -47,23 +57,53 @@ TRACK_LIST = {'aalborg': 'road',
               'mixed-1': 'dirt',
               'mixed-2': 'dirt'}
 
+NON_DIRT_TRACKS = frozenset(track for track, track_type in TRACK_LIST.items() if track_type != 'dirt')
+# a-speedway is the only speedway kept when training on every track
+ALL_TRACKS_TRAINING_SET = NON_DIRT_TRACKS - frozenset(['b-speedway', 'c-speedway', 'd-speedway', 'e-speedway',
+                                                       'f-speedway', 'g-speedway'])
+
+# Progress files are written by a background thread, so saving them never stalls training
+PENDING_WRITES = queue.Queue()
+
+
+def write_pending_files():
+    while True:
+        write, args = PENDING_WRITES.get()
+        try:
+            write(*args)
+        except Exception:
+            traceback.print_exc()
+        finally:
+            PENDING_WRITES.task_done()
+
+
+threading.Thread(target=write_pending_files, daemon=True).start()
+# Queued writes still reach the disk when the interpreter exits
+atexit.register(PENDING_WRITES.join)
+
+
 class TrackUtilities:
     @staticmethod
     def create_complete_tracks_list(epsilons):
-        tracks = {}
-        for epsilon in epsilons:
-            tracks[str(epsilon)] = []
-        for epsilon in epsilons:
-            for track in TRACK_LIST.keys():
-                if TRACK_LIST[track] != 'dirt':
-                    if track != 'b-speedway' and track != 'c-speedway' and track != 'd-speedway' and track != 'e-speedway' and track != 'f-speedway' and track != 'g-speedway':
-                        tracks[str(epsilon)].append(track)
-        return tracks
+        return {str(epsilon): sorted(ALL_TRACKS_TRAINING_SET) for epsilon in epsilons}
 
     @staticmethod
     def save_remaining_tracks(tracks, filepath):
-        with open(filepath, 'w+') as f:
-            json.dump(tracks, f, sort_keys=True, indent=4)
+        # The deques keep changing while the write is pending, so queue a copy
+        remaining_tracks = {key: list(value) for key, value in tracks.items()}
+        PENDING_WRITES.put((TrackUtilities.__write_remaining_tracks, (remaining_tracks, filepath)))
+
+    @staticmethod
+    def __write_remaining_tracks(tracks, filepath):
+        # Write next to the target and rename, so a crash never leaves a truncated file behind
+        temporary_filepath = filepath + '.tmp'
+        if orjson:
+            with open(temporary_filepath, 'wb') as f:
+                f.write(orjson.dumps(tracks, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS))
+        else:
+            with open(temporary_filepath, 'w') as f:
+                json.dump(tracks, f, sort_keys=True, indent=4)
+        os.replace(temporary_filepath, filepath)
 
     @staticmethod
     def load_tracks(track_filename):
@@ -84,13 +124,17 @@ class TrackUtilities:
 
     @staticmethod
     def save_last_network_path(last_network_file_path, save_file_path):
+        PENDING_WRITES.put((TrackUtilities.__write_last_network_path, (last_network_file_path, save_file_path)))
+
+    @staticmethod
+    def __write_last_network_path(last_network_file_path, save_file_path):
         with open(last_network_file_path, 'w+') as f:
             print(save_file_path, file=f)
 
     @staticmethod
     def order_tracks(tracks):
         for key in tracks.keys():
-            tracks[key].sort()
+            tracks[key] = deque(sorted(tracks[key]))
 
     @staticmethod
     def train_on_all_tracks(root_dir='all_tracks'):
@@ -144,7 +188,7 @@ class TrackUtilities:
                                     epsilon=epsilon)
 
                     i += 1
-                    tracks[str(epsilon)].remove(track)
+                    tracks[str(epsilon)].popleft()
                     TrackUtilities.save_remaining_tracks(tracks, tracks_to_test_filepath)
                     TrackUtilities.save_last_network_path(last_network_filepath, save_filepath, i)
 
@@ -239,12 +283,7 @@ class TrackUtilities:
 
     @staticmethod
     def create_tracks_list(chosen_tracks, epsilons):
-        tracks = {}
-        for epsilon in epsilons:
-            tracks[str(epsilon)] = []
-            for track in chosen_tracks:
-                tracks[str(epsilon)].append(track)
-        return tracks
+        return {str(epsilon): list(chosen_tracks) for epsilon in epsilons}
 
     @staticmethod
     def train_on_chosen_tracks(chosen_tracks, epsilons, steps, root_dir):
@@ -285,7 +324,7 @@ class TrackUtilities:
                                 nb_steps=steps, load_file_path=load_filepath, save_file_path=save_filepath,
                                 verbose=1, timeout=40000, epsilon=epsilon)
 
-                tracks[str(epsilon)].remove(track)
+                tracks[str(epsilon)].popleft()
                 i += 1
                 TrackUtilities.save_remaining_tracks(tracks, remaining_tracks_filepath)
                 TrackUtilities.save_last_network_path(last_network_filepath, save_filepath, i)
@@ -297,11 +336,11 @@ class TrackUtilities:
     def test_network(track, load_filepath, n_lap):
         # DDPGTorcs.test(None, load_filepath, track=track)
         env = TorcsEnv(gui=True, timeout=10000, track=track, reward=DefaultReward(), n_lap=n_lap)
-        model = DDPGTorcs.get_loaded_actor(load_filepath, env.observation_space.shape, env.action_space.shape)
+        model = FrozenActor(DDPGTorcs.get_loaded_actor(load_filepath, env.observation_space.shape, env.action_space.shape))
         observation = env.reset()
 
         while True:
-            action = model.predict(np.array([np.array([observation])]))[0]
+            action = model.predict_on_batch(np.array([np.array([observation])]))[0]
             observation, reward, done, d = env.step(action)
 
     @staticmethod
@@ -313,7 +352,8 @@ class TrackUtilities:
 
         models = []
         for filepath in models_filepaths:
-            models.append(DDPGTorcs.get_loaded_actor(filepath, env.observation_space.shape, env.action_space.shape))
+            models.append(FrozenActor(DDPGTorcs.get_loaded_actor(filepath, env.observation_space.shape,
+                                                                 env.action_space.shape)))
 
         observation = env.reset()
 
@@ -321,7 +361,7 @@ class TrackUtilities:
         while True:
             actions = []
             for model in models:
-                result = model.predict(np.array([np.array([observation])]))[0]
+                result = model.predict_on_batch(np.array([np.array([observation])]))[0]
                 actions.append(result)
             for action in actions:
                 print(action[1], file=accel_dump)